@@ -0,0 +1,443 @@
+"""Streaming bulk export/import of users and chores as NDJSON.
+
+Usage:
+    python -m app.cli.bulk export dump.ndjson [--resume] [--batch-size N]
+    python -m app.cli.bulk import dump.ndjson [--resume] [--batch-size N] [--skip-indexes]
+    python -m app.cli.bulk migrate [--resume] [--batch-size N] [--checkpoint migrate.checkpoint]
+    python -m app.cli.bulk migrate-keys [--resume] [--batch-size N] [--checkpoint migrate-keys.checkpoint]
+
+Each line is {"type": "user" | "chore", "data": {...}}. Keys are walked with
+SCAN and read/written in pipelined batches, so memory stays flat no matter how
+many records there are. Progress is checkpointed to <file>.checkpoint after
+every batch; pass --resume to pick up from the last checkpoint.
+
+With --cluster (or REDIS_CLUSTER=true) --host/--port name any cluster node.
+Keys are scanned on every primary in turn and writes are routed to the node
+owning each key's slot. Checkpoints record the position per primary, so
+--resume needs the same set of primaries. Export only reads the current
+hash-tagged key layout (see app.services.keys) and import always writes it.
+
+`migrate` rewrites records stored in an older format (see app.services.codec)
+with the configured RECORD_CODEC in place. It is safe to run against a live
+deployment: each record is only replaced if it has not changed since it was read.
+
+`migrate-keys` moves records still under the pre-hash-tag key names
+(chore:<id>, user:<id>, user_email:<email>) to the current layout, rebuilds
+their chore name indexes and deletes the old keys. A record that already exists
+under its new key was written by the app since, so only the old key is deleted.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+
+import redis
+from redis.cluster import RedisCluster
+from dotenv import load_dotenv
+from app.models.chore import Chore
+from app.models.user import User
+from app.services.codec import is_legacy_json, record_codec
+from app.services.keys import (
+    CHORE_KEY_PATTERN,
+    LEGACY_CHORE_KEY_PATTERN,
+    LEGACY_USER_EMAIL_KEY_PATTERN,
+    LEGACY_USER_KEY_PATTERN,
+    USER_EMAIL_KEY_PATTERN,
+    USER_KEY_PATTERN,
+    chore_key,
+    chore_name_member,
+    user_chore_names_key,
+    user_email_key,
+    user_key,
+)
+
+load_dotenv()
+
+# Primary records in export order. user_email:* and the per-user chore name
+# indexes are derived from these and rebuilt on import instead of exported.
+RECORD_TYPES = [
+    ("user", USER_KEY_PATTERN),
+    ("chore", CHORE_KEY_PATTERN),
+]
+
+# Everything `migrate` re-encodes, including the derived user_email:* copies
+MIGRATE_RECORD_TYPES = RECORD_TYPES + [("user", USER_EMAIL_KEY_PATTERN)]
+
+# Old key names `migrate-keys` moves, with the new key for each decoded record
+LEGACY_KEY_TYPES = [
+    ("user", LEGACY_USER_KEY_PATTERN, lambda user: user_key(user.id)),
+    ("user", LEGACY_USER_EMAIL_KEY_PATTERN, lambda user: user_email_key(user.email)),
+    ("chore", LEGACY_CHORE_KEY_PATTERN, lambda chore: chore_key(chore.id)),
+]
+
+# Replace a record only if it still holds the value we read (compare-and-set).
+# Called by SHA after SCRIPT LOAD, which a cluster client sends to every node.
+REPLACE_IF_UNCHANGED = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('SET', KEYS[1], ARGV[2])
+end
+return nil
+"""
+
+
+def get_redis_client(args) -> redis.Redis:
+    """Build a Redis client from CLI flags, falling back to the app's env config"""
+    host = args.host or os.getenv("REDIS_HOST", "localhost")
+    port = args.port or int(os.getenv("REDIS_PORT", 6379))
+    password = args.password or os.getenv("REDIS_PASSWORD", None)
+    if args.cluster or os.getenv("REDIS_CLUSTER", "false").lower() == "true":
+        return RedisCluster(host=host, port=port, password=password)
+    return redis.Redis(host=host, port=port, password=password)
+
+
+def scan_phases(client: redis.Redis, record_types: list) -> list:
+    """Each record type paired with every node to SCAN: the primaries of a cluster, or None"""
+    if isinstance(client, RedisCluster):
+        nodes = sorted(node.name for node in client.get_primaries())
+    else:
+        nodes = [None]
+    return [(*record_type, node) for record_type in record_types for node in nodes]
+
+
+def scan_keys(client: redis.Redis, node: Optional[str], cursor: int, pattern: str, count: int):
+    """One SCAN step on `node`, returning (next cursor, keys)"""
+    if node is None:
+        return client.scan(cursor=cursor, match=pattern, count=count)
+    cursors, keys = client.scan(cursor=cursor, match=pattern, count=count, target_nodes=client.get_node(node_name=node))
+    return cursors[node], keys
+
+
+def load_checkpoint(path: str) -> Optional[dict]:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def save_checkpoint(path: str, state: dict) -> None:
+    # Write then rename so a crash never leaves a half-written checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def clear_checkpoint(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class ThroughputReporter:
+    """Prints records/sec every `interval` seconds and a summary at the end"""
+
+    def __init__(self, label: str, interval: float = 5.0, initial: int = 0):
+        self.label = label
+        self.interval = interval
+        self.initial = initial
+        self.count = initial
+        self.started_at = time.monotonic()
+        self.last_report_at = self.started_at
+
+    def add(self, n: int) -> None:
+        self.count += n
+        now = time.monotonic()
+        if now - self.last_report_at >= self.interval:
+            self.last_report_at = now
+            print(f"{self.label}: {self.count} records ({self.rate():.0f} records/s)", file=sys.stderr)
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return (self.count - self.initial) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> None:
+        elapsed = time.monotonic() - self.started_at
+        print(
+            f"{self.label} finished: {self.count} records, "
+            f"{self.count - self.initial} this run in {elapsed:.1f}s ({self.rate():.0f} records/s)",
+            file=sys.stderr
+        )
+
+
+def decode_record(record_type: str, value: bytes):
+    if record_type == "user":
+        return record_codec.decode_user(value)
+    return record_codec.decode_chore(value)
+
+
+def encode_record(record_type: str, record) -> bytes:
+    if record_type == "user":
+        return record_codec.encode_user(record)
+    return record_codec.encode_chore(record)
+
+
+def export_records(client: redis.Redis, out_path: str, batch_size: int, resume: bool) -> int:
+    """Stream every user and chore record to `out_path`, returning the record count"""
+    checkpoint_path = f"{out_path}.checkpoint"
+    state = load_checkpoint(checkpoint_path) if resume else None
+    # A checkpoint without its output file can't be resumed, so start over
+    if state is None or not os.path.exists(out_path):
+        state = {"phase": 0, "cursor": 0, "offset": 0, "records": 0}
+        mode = "wb"
+    else:
+        print(f"Resuming export from {state}", file=sys.stderr)
+        mode = "r+b"
+
+    reporter = ThroughputReporter("export", initial=state["records"])
+
+    with open(out_path, mode) as out:
+        # Drop anything written after the last checkpoint
+        out.seek(state["offset"])
+        out.truncate()
+
+        phases = scan_phases(client, RECORD_TYPES)
+        for phase in range(state["phase"], len(phases)):
+            record_type, pattern, node = phases[phase]
+            cursor = state["cursor"] if phase == state["phase"] else 0
+
+            while True:
+                cursor, keys = scan_keys(client, node, cursor, pattern, batch_size)
+                written = 0
+                if keys:
+                    pipe = client.pipeline(transaction=False)
+                    for key in keys:
+                        pipe.get(key)
+                    for value in pipe.execute():
+                        # Key was deleted between SCAN and GET
+                        if value is None:
+                            continue
+                        # Legacy JSON values are single-line, so splice them in as-is
+                        if not is_legacy_json(value):
+                            value = decode_record(record_type, value).json().encode("utf-8")
+                        out.write(b'{"type": "' + record_type.encode() + b'", "data": ' + value + b'}\n')
+                        written += 1
+                out.flush()
+                reporter.add(written)
+
+                if cursor == 0:
+                    state = {"phase": phase + 1, "cursor": 0, "offset": out.tell(), "records": reporter.count}
+                else:
+                    state = {"phase": phase, "cursor": cursor, "offset": out.tell(), "records": reporter.count}
+                save_checkpoint(checkpoint_path, state)
+
+                if cursor == 0:
+                    break
+
+    clear_checkpoint(checkpoint_path)
+    reporter.summary()
+    return reporter.count
+
+
+def write_batch(client: redis.Redis, lines: List[str], rebuild_indexes: bool) -> int:
+    """Write one batch of NDJSON lines in a single pipeline round trip"""
+    pipe = client.pipeline(transaction=False)
+    written = 0
+    for line in lines:
+        record = json.loads(line)
+        record_type = record.get("type")
+        data = record.get("data")
+
+        if record_type == "user":
+            value = record_codec.encode_user(User.parse_obj(data))
+            pipe.set(user_key(data["id"]), value)
+            if rebuild_indexes:
+                pipe.set(user_email_key(data["email"]), value)
+        elif record_type == "chore":
+            value = record_codec.encode_chore(Chore.parse_obj(data))
+            pipe.set(chore_key(data["id"]), value)
+            if rebuild_indexes:
+                member = chore_name_member(data["name"], data["id"])
+                for person in data.get("people", []):
+                    pipe.zadd(user_chore_names_key(person["user_id"]), {member: 0})
+        else:
+            print(f"Skipping record with unknown type: {record_type}", file=sys.stderr)
+            continue
+        written += 1
+
+    pipe.execute()
+    return written
+
+
+def import_records(client: redis.Redis, in_path: str, batch_size: int, resume: bool, rebuild_indexes: bool) -> int:
+    """Stream records from `in_path` into Redis, returning the record count"""
+    checkpoint_path = f"{in_path}.checkpoint"
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state is None:
+        state = {"line": 0, "records": 0}
+    else:
+        print(f"Resuming import from {state}", file=sys.stderr)
+
+    reporter = ThroughputReporter("import", initial=state["records"])
+    line_no = state["line"]
+    batch: List[str] = []
+
+    def flush():
+        reporter.add(write_batch(client, batch, rebuild_indexes))
+        batch.clear()
+        save_checkpoint(checkpoint_path, {"line": line_no, "records": reporter.count})
+
+    with open(in_path, encoding="utf-8") as f:
+        for current_line, line in enumerate(f, 1):
+            if current_line <= state["line"]:
+                continue
+            line_no = current_line
+            if line.strip():
+                batch.append(line)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+    clear_checkpoint(checkpoint_path)
+    reporter.summary()
+    return reporter.count
+
+
+def migrate_records(client: redis.Redis, checkpoint_path: str, batch_size: int, resume: bool) -> int:
+    """Re-encode records not yet in the configured format, returning how many were rewritten"""
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state is None:
+        state = {"phase": 0, "cursor": 0, "records": 0}
+    else:
+        print(f"Resuming migration from {state}", file=sys.stderr)
+
+    replace_if_unchanged = client.script_load(REPLACE_IF_UNCHANGED)
+    reporter = ThroughputReporter("migrate", initial=state["records"])
+
+    phases = scan_phases(client, MIGRATE_RECORD_TYPES)
+    for phase in range(state["phase"], len(phases)):
+        record_type, pattern, node = phases[phase]
+        cursor = state["cursor"] if phase == state["phase"] else 0
+
+        while True:
+            cursor, keys = scan_keys(client, node, cursor, pattern, batch_size)
+            migrated = 0
+            if keys:
+                pipe = client.pipeline(transaction=False)
+                for key in keys:
+                    pipe.get(key)
+                values = pipe.execute()
+
+                pipe = client.pipeline(transaction=False)
+                for key, value in zip(keys, values):
+                    if value is None or record_codec.is_current(value):
+                        continue
+                    new_value = encode_record(record_type, decode_record(record_type, value))
+                    pipe.evalsha(replace_if_unchanged, 1, key, value, new_value)
+                    migrated += 1
+                # Records changed since the GET were written by the app in the new format already
+                pipe.execute()
+            reporter.add(migrated)
+
+            next_phase = phase + 1 if cursor == 0 else phase
+            save_checkpoint(checkpoint_path, {"phase": next_phase, "cursor": cursor, "records": reporter.count})
+            if cursor == 0:
+                break
+
+    clear_checkpoint(checkpoint_path)
+    reporter.summary()
+    return reporter.count
+
+
+def migrate_keys(client: redis.Redis, checkpoint_path: str, batch_size: int, resume: bool) -> int:
+    """Move records from legacy key names to the hash-tagged layout, returning how many were moved"""
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state is None:
+        state = {"phase": 0, "cursor": 0, "records": 0}
+    else:
+        print(f"Resuming key migration from {state}", file=sys.stderr)
+
+    reporter = ThroughputReporter("migrate-keys", initial=state["records"])
+
+    phases = scan_phases(client, LEGACY_KEY_TYPES)
+    for phase in range(state["phase"], len(phases)):
+        record_type, pattern, new_key, node = phases[phase]
+        cursor = state["cursor"] if phase == state["phase"] else 0
+
+        while True:
+            cursor, keys = scan_keys(client, node, cursor, pattern, batch_size)
+            moved = 0
+            if keys:
+                pipe = client.pipeline(transaction=False)
+                for key in keys:
+                    pipe.get(key)
+                values = pipe.execute()
+
+                # Old and new keys hash to different slots, so this is a copy
+                # then delete rather than a RENAME; SET NX keeps newer app writes
+                pipe = client.pipeline(transaction=False)
+                for key, value in zip(keys, values):
+                    if value is None:
+                        continue
+                    record = decode_record(record_type, value)
+                    pipe.set(new_key(record), encode_record(record_type, record), nx=True)
+                    if record_type == "chore":
+                        member = chore_name_member(record.name, record.id)
+                        for person in record.people:
+                            pipe.zadd(user_chore_names_key(person.user_id), {member: 0})
+                    pipe.delete(key)
+                    moved += 1
+                pipe.execute()
+            reporter.add(moved)
+
+            next_phase = phase + 1 if cursor == 0 else phase
+            save_checkpoint(checkpoint_path, {"phase": next_phase, "cursor": cursor, "records": reporter.count})
+            if cursor == 0:
+                break
+
+    clear_checkpoint(checkpoint_path)
+    reporter.summary()
+    return reporter.count
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk export/import of users and chores")
+    parser.add_argument("--host", help="Redis host (defaults to REDIS_HOST)")
+    parser.add_argument("--port", type=int, help="Redis port (defaults to REDIS_PORT)")
+    parser.add_argument("--password", help="Redis password (defaults to REDIS_PASSWORD)")
+    parser.add_argument("--cluster", action="store_true", help="Connect to a Redis Cluster (defaults to REDIS_CLUSTER)")
+
+    # Shared by every subcommand so they can follow it, e.g. `export dump.ndjson --resume`
+    batch_options = argparse.ArgumentParser(add_help=False)
+    batch_options.add_argument("--batch-size", type=int, default=1000, help="Keys per SCAN/pipeline batch")
+    batch_options.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", parents=[batch_options], help="Write all records to an NDJSON file")
+    export_parser.add_argument("path")
+
+    import_parser = subparsers.add_parser("import", parents=[batch_options], help="Load records from an NDJSON file")
+    import_parser.add_argument("path")
+    import_parser.add_argument(
+        "--skip-indexes",
+        action="store_true",
+        help="Only write primary records, without rebuilding email lookups and name indexes"
+    )
+
+    migrate_parser = subparsers.add_parser("migrate", parents=[batch_options], help="Re-encode stored records with RECORD_CODEC")
+    migrate_parser.add_argument("--checkpoint", default="migrate.checkpoint", help="Checkpoint file path")
+
+    migrate_keys_parser = subparsers.add_parser(
+        "migrate-keys",
+        parents=[batch_options],
+        help="Move records from legacy key names to the hash-tagged layout"
+    )
+    migrate_keys_parser.add_argument("--checkpoint", default="migrate-keys.checkpoint", help="Checkpoint file path")
+
+    args = parser.parse_args(argv)
+    client = get_redis_client(args)
+
+    if args.command == "export":
+        export_records(client, args.path, args.batch_size, args.resume)
+    elif args.command == "import":
+        import_records(client, args.path, args.batch_size, args.resume, not args.skip_indexes)
+    elif args.command == "migrate":
+        migrate_records(client, args.checkpoint, args.batch_size, args.resume)
+    else:
+        migrate_keys(client, args.checkpoint, args.batch_size, args.resume)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare record codecs: encoded size, Redis memory and encode/decode time.
+
+Usage:
+    python -m app.cli.codec_benchmark [--people 4] [--chores 20] [--redis]
+
+With --redis, sample records are written under bench:* keys on the configured
+Redis (REDIS_HOST/REDIS_PORT) to read MEMORY USAGE, then deleted.
+"""
+import argparse
+import os
+import timeit
+from datetime import datetime
+from uuid import uuid4
+
+import redis
+from dotenv import load_dotenv
+from app.models.chore import Chore, Person
+from app.models.user import User
+from app.services.codec import JsonCodec, MsgpackCodec, RecordCodec
+
+load_dotenv()
+
+
+def sample_chore(people: int) -> Chore:
+    members = [Person(id=str(uuid4()), name=f"Person {i}", user_id=str(uuid4())) for i in range(people)]
+    return Chore(
+        id=str(uuid4()),
+        name="Take out the recycling",
+        people=members,
+        current_person_index=0,
+        created_by=members[0].user_id,
+        created_by_name=members[0].name
+    )
+
+
+def sample_user(chores: int) -> User:
+    return User(
+        id=str(uuid4()),
+        email="someone@example.com",
+        full_name="Some One",
+        # Same length as a bcrypt hash
+        hashed_password="$2b$12$" + "x" * 53,
+        created_at=datetime.utcnow(),
+        chore_ids=[str(uuid4()) for _ in range(chores)]
+    )
+
+
+def time_us(func, number: int) -> float:
+    return timeit.timeit(func, number=number) / number * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark chore/user record codecs")
+    parser.add_argument("--people", type=int, default=4, help="People per sample chore")
+    parser.add_argument("--chores", type=int, default=20, help="Chore IDs per sample user")
+    parser.add_argument("--number", type=int, default=20000, help="Iterations per timing")
+    parser.add_argument("--redis", action="store_true", help="Also measure MEMORY USAGE in Redis")
+    args = parser.parse_args()
+
+    client = None
+    if args.redis:
+        client = redis.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            password=os.getenv("REDIS_PASSWORD", None)
+        )
+
+    chore = sample_chore(args.people)
+    user = sample_user(args.chores)
+    # Decoding always goes through RecordCodec, which picks the format from the data
+    reader = RecordCodec("json")
+
+    print(f"{'record':<8}{'codec':<10}{'bytes':>8}{'redis':>8}{'encode us':>12}{'decode us':>12}")
+    for codec in (JsonCodec(), MsgpackCodec()):
+        for label, record, encode, decode in (
+            ("chore", chore, codec.encode_chore, reader.decode_chore),
+            ("user", user, codec.encode_user, reader.decode_user),
+        ):
+            data = encode(record)
+            memory = "-"
+            if client is not None:
+                key = f"bench:{label}:{codec.name}"
+                client.set(key, data)
+                memory = client.memory_usage(key, samples=0)
+                client.delete(key)
+            encode_us = time_us(lambda: encode(record), args.number)
+            decode_us = time_us(lambda: decode(data), args.number)
+            print(f"{label:<8}{codec.name:<10}{len(data):>8}{memory:>8}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 from app.routers import auths, chores, websockets
+from app.services.redis_service import redis_service
+from app.services.websocket_service import websocket_manager
+from app.services.task_queue import task_queue
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Redis subscriber, websocket heartbeats and task workers live for the whole process
+    await websocket_manager.start()
+    await task_queue.start()
+    yield
+    await task_queue.stop()
+    await websocket_manager.stop()
+    redis_service.close()
+
 app = FastAPI(
     title="Chore Management API", 
     version="1.0.0",
-    description="Real-time chore management with WebSocket support and user authentication"
+    description="Real-time chore management with WebSocket support and user authentication",
+    lifespan=lifespan
 )
 
 # CORS middleware for React Native
@@ -30,10 +46,20 @@ async def root():
     return {
         "message": "Chore Management API",
         "docs": "/docs",
-        "websocket": "/ws",
+        "websocket": "/ws?token=<access_token>",
         "auth": "/api/auth"
     }
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    """Readiness probe: 503 when Redis or the pub/sub subscriber is down"""
+    checks = {
+        "redis": await websocket_manager.redis_available(),
+        "subscriber": await websocket_manager.is_ready(),
+    }
+    if all(checks.values()):
+        return {"status": "healthy", **checks}
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "degraded", **checks}
+    )
\ No newline at end of file
@@ -17,6 +17,9 @@ class Chore(BaseModel):
 class CreateChoreRequest(BaseModel):
     name: str
 
+class UpdateChoreRequest(BaseModel):
+    name: str
+
 class AddPersonRequest(BaseModel):
     email: str  # Changed from username to email
 
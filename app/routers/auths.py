@@ -109,9 +109,8 @@ async def join_chore(
     redis_service.save_chore(chore)
     
     # Add chore to user's chore list
-    if request.chore_id not in current_user.chore_ids:
-        current_user.chore_ids.append(request.chore_id)
-        auth_service.update_user(current_user)
+    auth_service.add_chore_id(current_user.id, request.chore_id)
+    redis_service.index_chore_name([current_user.id], request.chore_id, chore.name)
     
     # Get all participants for broadcast
     participant_ids = [person.user_id for person in chore.people]
@@ -125,4 +124,5 @@ async def join_chore(
         "participants": participant_ids
     })
     
-    return auth_service.user_to_response(current_user)
\ No newline at end of file
+    # Re-read so the response includes the chore list as stored
+    return auth_service.user_to_response(auth_service.get_user_by_id(current_user.id))
\ No newline at end of file
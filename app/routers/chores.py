@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List
 from uuid import uuid4
-from app.models.chore import Chore, Person, CreateChoreRequest, AddPersonRequest, ChoreUpdate
+from app.models.chore import Chore, Person, CreateChoreRequest, UpdateChoreRequest, AddPersonRequest, ChoreUpdate
 from app.models.user import User
+from app.services.keys import normalize_chore_name
 from app.services.redis_service import redis_service
+from app.services.task_queue import task_queue
+from app.services import chore_tasks  # noqa: F401 - registers task handlers
 from app.dependencies.auth import get_current_user
 
 router = APIRouter(prefix="/chores", tags=["chores"])
@@ -25,6 +28,18 @@ async def get_all_chores(current_user: User = Depends(get_current_user)):
         print(f"Error in get_all_chores: {e}")
         return []
 
+@router.get("/search", response_model=List[Chore])
+async def search_chores(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Find the current user's chores whose name starts with `q` (case-insensitive)"""
+    # min_length sees the raw query; whitespace alone would match every chore
+    if not normalize_chore_name(q):
+        raise HTTPException(status_code=422, detail="Search query must not be blank")
+    return redis_service.search_chores(current_user.id, q, limit)
+
 @router.get("/{chore_id}", response_model=Chore)
 async def get_chore(chore_id: str, current_user: User = Depends(get_current_user)):
     """Get a specific chore by ID"""
@@ -66,8 +81,8 @@ async def create_chore(
     redis_service.save_chore(chore)
     
     # Add chore to user's chore list for reference
-    current_user.chore_ids.append(chore_id)
-    auth_service.update_user(current_user)
+    auth_service.add_chore_id(current_user.id, chore_id)
+    redis_service.index_chore_name([current_user.id], chore_id, chore.name)
     
     # Broadcast update only to participants (handled by WebSocket)
     redis_service.publish_update({
@@ -78,12 +93,47 @@ async def create_chore(
     
     return chore
 
+@router.patch("/{chore_id}", response_model=Chore)
+async def rename_chore(
+    chore_id: str,
+    request: UpdateChoreRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Rename a chore"""
+    chore = redis_service.get_chore(chore_id)
+    if not chore:
+        raise HTTPException(status_code=404, detail="Chore not found")
+    
+    # Check if current user has access to this chore
+    if not any(person.user_id == current_user.id for person in chore.people):
+        raise HTTPException(status_code=403, detail="You don't have access to this chore")
+    
+    old_name = chore.name
+    chore.name = request.name
+    redis_service.save_chore(chore)
+    
+    participant_ids = [person.user_id for person in chore.people]
+    
+    # Update every member's name index and broadcast in the background
+    task_queue.enqueue(
+        "rename_chore",
+        user_ids=participant_ids,
+        chore_id=chore_id,
+        old_name=old_name,
+        new_name=chore.name,
+        update={
+            "type": "chore_renamed",
+            "chore_id": chore_id,
+            "chore": chore.dict(),
+            "participants": participant_ids
+        }
+    )
+    
+    return chore
+
 @router.delete("/{chore_id}")
 async def delete_chore(chore_id: str, current_user: User = Depends(get_current_user)):
     """Delete a chore (only creator can delete)"""
-    from app.services.auth_service import auth_service
-    from app.models.user import User
-    
     chore = redis_service.get_chore(chore_id)
     if not chore:
         raise HTTPException(status_code=404, detail="Chore not found")
@@ -99,24 +149,20 @@ async def delete_chore(chore_id: str, current_user: User = Depends(get_current_u
     # Get all participants before deletion for cleanup
     participant_ids = [person.user_id for person in chore.people]
     
-    # Remove chore from all participants' chore lists
-    redis_client = redis_service.redis_client
-    for user_id in participant_ids:
-        user_data = redis_client.get(f"user:{user_id}")
-        if user_data:
-            user = User.parse_raw(user_data)
-            if chore_id in user.chore_ids:
-                user.chore_ids.remove(chore_id)
-                auth_service.update_user(user)
-    
     redis_service.delete_chore(chore_id)
     
-    # Broadcast update to all participants
-    redis_service.publish_update({
-        "type": "chore_deleted",
-        "chore_id": chore_id,
-        "participants": participant_ids
-    })
+    # Remove chore from all participants' chore lists and broadcast in the background
+    task_queue.enqueue(
+        "remove_chore_from_users",
+        user_ids=participant_ids,
+        chore_id=chore_id,
+        chore_name=chore.name,
+        update={
+            "type": "chore_deleted",
+            "chore_id": chore_id,
+            "participants": participant_ids
+        }
+    )
     
     return {"message": "Chore deleted successfully"}
 
@@ -155,22 +201,23 @@ async def add_person_to_chore(
     chore.people.append(new_person)
     redis_service.save_chore(chore)
     
-    # Add chore to target user's chore list
-    if chore_id not in target_user.chore_ids:
-        target_user.chore_ids.append(chore_id)
-        auth_service.update_user(target_user)
-    
     # Get all current participants for broadcast
     participant_ids = [person.user_id for person in chore.people]
     
-    # Broadcast update to all participants
-    redis_service.publish_update({
-        "type": "person_added",
-        "chore_id": chore_id,
-        "chore": chore.dict(),
-        "person": new_person.dict(),
-        "participants": participant_ids
-    })
+    # Add chore to target user's chore list and broadcast in the background
+    task_queue.enqueue(
+        "add_chore_to_user",
+        user_id=target_user.id,
+        chore_id=chore_id,
+        chore_name=chore.name,
+        update={
+            "type": "person_added",
+            "chore_id": chore_id,
+            "chore": chore.dict(),
+            "person": new_person.dict(),
+            "participants": participant_ids
+        }
+    )
     
     return chore
 
@@ -181,8 +228,6 @@ async def remove_person_from_chore(
     current_user: User = Depends(get_current_user)
 ):
     """Remove a person from a chore"""
-    from app.services.auth_service import auth_service
-    
     chore = redis_service.get_chore(chore_id)
     if not chore:
         raise HTTPException(status_code=404, detail="Chore not found")
@@ -222,23 +267,23 @@ async def remove_person_from_chore(
     
     redis_service.save_chore(chore)
     
-    # Remove chore from removed user's chore list
-    removed_user = auth_service.get_user_by_id(removed_person.user_id)
-    if removed_user and chore_id in removed_user.chore_ids:
-        removed_user.chore_ids.remove(chore_id)
-        auth_service.update_user(removed_user)
-    
     # Get remaining participants for broadcast
     participant_ids = [person.user_id for person in chore.people]
     
-    # Broadcast update to remaining participants
-    redis_service.publish_update({
-        "type": "person_removed",
-        "chore_id": chore_id,
-        "chore": chore.dict(),
-        "removed_person": removed_person.dict(),
-        "participants": participant_ids
-    })
+    # Remove chore from removed user's chore list and broadcast in the background
+    task_queue.enqueue(
+        "remove_chore_from_users",
+        user_ids=[removed_person.user_id],
+        chore_id=chore_id,
+        chore_name=chore.name,
+        update={
+            "type": "person_removed",
+            "chore_id": chore_id,
+            "chore": chore.dict(),
+            "removed_person": removed_person.dict(),
+            "participants": participant_ids
+        }
+    )
     
     return chore
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
 from app.services.websocket_service import websocket_manager
 import json
 
@@ -6,22 +6,40 @@ router = APIRouter()
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    from app.services.auth_service import auth_service
+
     print(f"WebSocket connection attempt from: {websocket.client}")
-    await websocket_manager.connect(websocket)
+
+    # Authenticate with ?token=<access token> so this worker only subscribes
+    # to the channels of the users connected to it
+    token = websocket.query_params.get("token")
+    user_id = auth_service.verify_token(token) if token else None
+    user = auth_service.get_user_by_id(user_id) if user_id else None
+    if user is None or not user.is_active:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    if not await websocket_manager.connect(websocket, user.id):
+        print(f"WebSocket rejected, connection limit reached: {websocket.client}")
+        return
     print("WebSocket connected successfully")
     try:
         while True:
             # Keep connection alive and handle incoming messages
             data = await websocket.receive_text()
-            
-            # You can handle client messages here if needed
-            # For now, we'll just echo back a confirmation
+            # Any message from the client counts as a heartbeat, as does any
+            # message the server manages to deliver, so listen-only clients are fine
+            websocket_manager.touch(websocket)
+
             message = json.loads(data)
             if message.get("type") == "ping":
                 await websocket_manager.send_personal_message(
-                    json.dumps({"type": "pong"}), 
+                    json.dumps({"type": "pong"}),
                     websocket
                 )
-            
+            # Server {"type": "ping"} frames need no reply; a "pong" only refreshes the touch above
+
     except WebSocketDisconnect:
-        websocket_manager.disconnect(websocket)
\ No newline at end of file
+        pass
+    finally:
+        await websocket_manager.disconnect(websocket)
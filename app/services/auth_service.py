@@ -1,10 +1,12 @@
 import jwt
 import bcrypt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, List, Optional
 from uuid import uuid4
 import os
 from dotenv import load_dotenv
+from app.services.keys import user_key, user_email_key
+from app.services.codec import record_codec
 
 # Load environment variables
 load_dotenv()
@@ -42,26 +44,24 @@ class AuthService:
             return None
     
     def get_redis_client(self):
-        """Get Redis client from redis_service"""
+        """Get the binary Redis client used for user records from redis_service"""
         from app.services.redis_service import redis_service
-        return redis_service.redis_client
+        return redis_service.binary_client
     
     def get_user_by_email(self, email: str):
         """Get user by email"""
-        from app.models.user import User
         redis_client = self.get_redis_client()
-        user_data = redis_client.get(f"user_email:{email.lower()}")
+        user_data = redis_client.get(user_email_key(email))
         if user_data:
-            return User.parse_raw(user_data)
+            return record_codec.decode_user(user_data)
         return None
     
     def get_user_by_id(self, user_id: str):
         """Get user by ID"""
-        from app.models.user import User
         redis_client = self.get_redis_client()
-        user_data = redis_client.get(f"user:{user_id}")
+        user_data = redis_client.get(user_key(user_id))
         if user_data:
-            return User.parse_raw(user_data)
+            return record_codec.decode_user(user_data)
         return None
     
     def create_user(self, email: str, full_name: str, password: str):
@@ -82,16 +82,66 @@ class AuthService:
         
         # Save user with multiple keys for lookup
         redis_client = self.get_redis_client()
-        redis_client.set(f"user:{user_id}", user.json())
-        redis_client.set(f"user_email:{email.lower()}", user.json())
+        user_data = record_codec.encode_user(user)
+        redis_client.set(user_key(user_id), user_data)
+        redis_client.set(user_email_key(email), user_data)
         
         return user
     
     def update_user(self, user) -> None:
         """Update user in Redis"""
         redis_client = self.get_redis_client()
-        redis_client.set(f"user:{user.id}", user.json())
-        redis_client.set(f"user_email:{user.email.lower()}", user.json())
+        user_data = record_codec.encode_user(user)
+        redis_client.set(user_key(user.id), user_data)
+        redis_client.set(user_email_key(user.email), user_data)
+    
+    def update_chore_ids(self, user_id: str, change: Callable[[List[str]], bool]) -> None:
+        """Apply `change` to a user's chore_ids under WATCH, retrying if the record changes meanwhile.
+
+        `change` edits the list in place and returns whether it changed anything.
+        """
+        from app.services.redis_service import redis_service
+        redis_client = self.get_redis_client()
+        key = user_key(user_id)
+
+        def apply(pipe):
+            user_data = pipe.get(key)
+            if not user_data:
+                return None
+            user = record_codec.decode_user(user_data)
+            if not change(user.chore_ids):
+                return None
+            user_data = record_codec.encode_user(user)
+            pipe.multi()
+            pipe.set(key, user_data)
+            # In a cluster the email copy hashes to another slot, so it can't
+            # join the transaction and is written once it has committed
+            if not redis_service.cluster_mode:
+                pipe.set(user_email_key(user.email), user_data)
+            return user.email, user_data
+
+        written = redis_client.transaction(apply, key, value_from_callable=True)
+        if written and redis_service.cluster_mode:
+            email, user_data = written
+            redis_client.set(user_email_key(email), user_data)
+    
+    def add_chore_id(self, user_id: str, chore_id: str) -> None:
+        """Atomically add a chore to a user's chore list"""
+        def change(chore_ids: List[str]) -> bool:
+            if chore_id in chore_ids:
+                return False
+            chore_ids.append(chore_id)
+            return True
+        self.update_chore_ids(user_id, change)
+    
+    def remove_chore_id(self, user_id: str, chore_id: str) -> None:
+        """Atomically remove a chore from a user's chore list"""
+        def change(chore_ids: List[str]) -> bool:
+            if chore_id not in chore_ids:
+                return False
+            chore_ids.remove(chore_id)
+            return True
+        self.update_chore_ids(user_id, change)
     
     def user_to_response(self, user):
         """Convert User to UserResponse (excluding sensitive data)"""
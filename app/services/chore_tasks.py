@@ -0,0 +1,39 @@
+from typing import List, Optional
+from app.services.auth_service import auth_service
+from app.services.redis_service import redis_service
+from app.services.task_queue import task_queue
+
+# Handlers may run more than once (retries, reclaimed entries) and out of order
+# with later requests for the same chore, so each one reloads the chore and
+# only writes what still matches it. Adds index the chore's current name;
+# chore_name is kept in the signatures so tasks queued before the name index
+# existed still run.
+
+@task_queue.register("add_chore_to_user")
+def add_chore_to_user(user_id: str, chore_id: str, update: dict, chore_name: Optional[str] = None) -> None:
+    """Add a chore to a user's chore list and name index, then broadcast the update"""
+    chore = redis_service.get_chore(chore_id)
+    # Skip the writes if the user was removed or the chore deleted since this was queued
+    if chore and user_id in {person.user_id for person in chore.people}:
+        auth_service.add_chore_id(user_id, chore_id)
+        redis_service.index_chore_name([user_id], chore_id, chore.name)
+    redis_service.publish_update(update)
+
+@task_queue.register("remove_chore_from_users")
+def remove_chore_from_users(user_ids: List[str], chore_id: str, update: dict, chore_name: Optional[str] = None) -> None:
+    """Remove a chore from each user's chore list and name index, then broadcast the update"""
+    chore = redis_service.get_chore(chore_id)
+    # Leave alone anyone who was added back since this was queued
+    members = {person.user_id for person in chore.people} if chore else set()
+    user_ids = [user_id for user_id in user_ids if user_id not in members]
+    for user_id in user_ids:
+        auth_service.remove_chore_id(user_id, chore_id)
+    if chore_name is not None and user_ids:
+        redis_service.unindex_chore_name(user_ids, chore_id, chore_name)
+    redis_service.publish_update(update)
+
+@task_queue.register("rename_chore")
+def rename_chore(user_ids: List[str], chore_id: str, old_name: str, new_name: str, update: dict) -> None:
+    """Move a renamed chore to its new position in each member's name index, then broadcast"""
+    redis_service.index_chore_name(user_ids, chore_id, new_name, old_name=old_name)
+    redis_service.publish_update(update)
@@ -0,0 +1,137 @@
+"""Storage formats for chore and user records.
+
+Records are written with the codec selected by RECORD_CODEC ("msgpack" by
+default, or "json" for the original pydantic .json() text). Reads detect the
+format from the first byte, so both can coexist while old records are
+migrated (see `python -m app.cli.bulk migrate`):
+
+    b"{"    legacy JSON, parsed and validated by pydantic
+    b"\\x01" msgpack v1: positional arrays; users are decoded without
+            validation since only this service writes them
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from dotenv import load_dotenv
+from app.models.chore import Chore
+from app.models.user import User
+
+load_dotenv()
+
+MSGPACK_V1 = b"\x01"
+EPOCH = datetime(1970, 1, 1)
+
+def is_legacy_json(data: bytes) -> bool:
+    return data[:1] == b"{"
+
+class JsonCodec:
+    name = "json"
+
+    def encode_chore(self, chore: Chore) -> bytes:
+        return chore.json().encode("utf-8")
+
+    def encode_user(self, user: User) -> bytes:
+        return user.json().encode("utf-8")
+
+class MsgpackCodec:
+    """Field names are implied by position; bump the version byte when the layout changes"""
+
+    name = "msgpack"
+
+    def __init__(self):
+        import msgpack
+        self.msgpack = msgpack
+
+    def encode_chore(self, chore: Chore) -> bytes:
+        return MSGPACK_V1 + self.msgpack.packb([
+            chore.id,
+            chore.name,
+            [[person.id, person.name, person.user_id] for person in chore.people],
+            chore.current_person_index,
+            chore.created_by,
+            chore.created_by_name,
+        ])
+
+    def encode_user(self, user: User) -> bytes:
+        # Stored as integer microseconds of naive UTC, which is what datetime.utcnow()
+        # gives; aware values (e.g. parsed from an import) are converted first
+        created_at = user.created_at
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        created_at = (created_at - EPOCH) // timedelta(microseconds=1)
+        return MSGPACK_V1 + self.msgpack.packb([
+            user.id,
+            user.email,
+            user.full_name,
+            user.hashed_password,
+            user.is_active,
+            created_at,
+            user.chore_ids,
+        ])
+
+    def decode_chore(self, data: bytes) -> Chore:
+        chore_id, name, people, current_person_index, created_by, created_by_name = self.msgpack.unpackb(data[1:])
+        # A single pydantic-core validation pass is cheaper than model_construct
+        # for the nested Person models, so chores keep validation
+        return Chore.model_validate({
+            "id": chore_id,
+            "name": name,
+            "people": [{"id": p[0], "name": p[1], "user_id": p[2]} for p in people],
+            "current_person_index": current_person_index,
+            "created_by": created_by,
+            "created_by_name": created_by_name,
+        })
+
+    def decode_user(self, data: bytes) -> User:
+        user_id, email, full_name, hashed_password, is_active, created_at, chore_ids = self.msgpack.unpackb(data[1:])
+        # EmailStr validation dominates decode time and we validated on write
+        return User.model_construct(
+            id=user_id,
+            email=email,
+            full_name=full_name,
+            hashed_password=hashed_password,
+            is_active=is_active,
+            created_at=EPOCH + timedelta(microseconds=created_at),
+            chore_ids=chore_ids
+        )
+
+class RecordCodec:
+    """Encodes with the configured format and decodes any supported one"""
+
+    def __init__(self, name: str):
+        self.json = JsonCodec()
+        self._msgpack: Optional[MsgpackCodec] = None
+        self.writer = self.msgpack if name == "msgpack" else self.json
+
+    @property
+    def msgpack(self) -> MsgpackCodec:
+        # Only needs the msgpack package once a msgpack record is written or read
+        if self._msgpack is None:
+            self._msgpack = MsgpackCodec()
+        return self._msgpack
+
+    def encode_chore(self, chore: Chore) -> bytes:
+        return self.writer.encode_chore(chore)
+
+    def encode_user(self, user: User) -> bytes:
+        return self.writer.encode_user(user)
+
+    def decode_chore(self, data: bytes) -> Chore:
+        if is_legacy_json(data):
+            return Chore.parse_raw(data)
+        if data[:1] == MSGPACK_V1:
+            return self.msgpack.decode_chore(data)
+        raise ValueError(f"Unknown chore record format: {data[:1]!r}")
+
+    def decode_user(self, data: bytes) -> User:
+        if is_legacy_json(data):
+            return User.parse_raw(data)
+        if data[:1] == MSGPACK_V1:
+            return self.msgpack.decode_user(data)
+        raise ValueError(f"Unknown user record format: {data[:1]!r}")
+
+    def is_current(self, data: bytes) -> bool:
+        """Whether a stored record is already in the configured write format"""
+        return is_legacy_json(data) == (self.writer is self.json)
+
+record_codec = RecordCodec(os.getenv("RECORD_CODEC", "msgpack").lower())
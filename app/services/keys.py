@@ -0,0 +1,60 @@
+"""Redis key and channel layout.
+
+Every key carries a hash tag ({...}) that decides its Redis Cluster slot; on a
+single node the braces are just part of the name. A chore's record is tagged
+with the chore id, and a user's record, chore name index and update channel
+with the user id, so each of those groups can share a transaction or script.
+user_email:{email} is tagged with the email and so lives in a different slot
+from user:{id}; the two copies of a user record are written separately.
+"""
+
+# Match only the hash-tagged layout so SCANs never pick up legacy keys
+CHORE_KEY_PATTERN = "chore:{*"
+USER_KEY_PATTERN = "user:{*"
+USER_EMAIL_KEY_PATTERN = "user_email:{*"
+
+# Keys from before hash tags (chore:<id>, user:<id>, user_email:<email>), moved
+# by `python -m app.cli.bulk migrate-keys`
+LEGACY_CHORE_KEY_PATTERN = "chore:[^{]*"
+LEGACY_USER_KEY_PATTERN = "user:[^{]*"
+LEGACY_USER_EMAIL_KEY_PATTERN = "user_email:[^{]*"
+
+# Same hash tag so a retry/dead-letter XADD and its XACK can share a transaction
+TASK_STREAM = "tasks:{side_effects}"
+TASK_DEAD_LETTER_STREAM = "tasks:{side_effects}:dead"
+
+# Name index members are "<normalized name>\x00<chore id>" so equal names stay
+# distinct and ZRANGEBYLEX from "[prefix" to "(prefix<max char>" finds every
+# completion; U+10FFFF encodes above any other UTF-8 character.
+NAME_INDEX_SEPARATOR = "\x00"
+NAME_INDEX_MAX_CHAR = "\U0010ffff"
+
+
+def chore_key(chore_id: str) -> str:
+    return f"chore:{{{chore_id}}}"
+
+
+def user_key(user_id: str) -> str:
+    return f"user:{{{user_id}}}"
+
+
+def user_email_key(email: str) -> str:
+    return f"user_email:{{{email.lower()}}}"
+
+
+def user_chore_names_key(user_id: str) -> str:
+    """Sorted set of the names of the chores a user belongs to, for prefix search"""
+    return f"user_chore_names:{{{user_id}}}"
+
+
+def normalize_chore_name(name: str) -> str:
+    return name.strip().casefold().replace(NAME_INDEX_SEPARATOR, "")
+
+
+def chore_name_member(name: str, chore_id: str) -> str:
+    return f"{normalize_chore_name(name)}{NAME_INDEX_SEPARATOR}{chore_id}"
+
+
+def user_channel(user_id: str) -> str:
+    """Pub/sub channel carrying chore events for one user"""
+    return f"chore_updates:{{{user_id}}}"
@@ -1,7 +1,20 @@
 import redis
+import redis.asyncio
+from redis.cluster import RedisCluster
 import json
 from typing import List, Optional
 from app.models.chore import Chore, Person
+from app.services.codec import record_codec
+from app.services.keys import (
+    CHORE_KEY_PATTERN,
+    NAME_INDEX_MAX_CHAR,
+    NAME_INDEX_SEPARATOR,
+    chore_key,
+    chore_name_member,
+    normalize_chore_name,
+    user_channel,
+    user_chore_names_key,
+)
 import os
 from dotenv import load_dotenv
 
@@ -9,36 +22,160 @@ load_dotenv()
 
 class RedisService:
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=os.getenv("REDIS_HOST", "localhost"),
-            port=int(os.getenv("REDIS_PORT", 6379)),
-            password=os.getenv("REDIS_PASSWORD", None),  # Add support for Redis password
+        self.host = os.getenv("REDIS_HOST", "localhost")
+        self.port = int(os.getenv("REDIS_PORT", 6379))
+        self.password = os.getenv("REDIS_PASSWORD", None)  # Add support for Redis password
+        self.cluster_mode = os.getenv("REDIS_CLUSTER", "false").lower() == "true"
+        max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+        # Handlers call Redis synchronously on the event loop, so an unresponsive
+        # server must fail fast instead of hanging the worker
+        self.socket_timeout = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+
+        # Shared by RedisService and AuthService; closed by the app lifespan.
+        # Records are binary (see app.services.codec), so they go through a
+        # second client that returns raw bytes.
+        self.redis_client = self.create_client(max_connections, decode_responses=True)
+        self.binary_client = self.create_client(max_connections, decode_responses=False)
+
+    def create_client(self, max_connections: int, decode_responses: bool):
+        if self.cluster_mode:
+            # Discovers the other nodes from the startup node and keeps a pool per node
+            return RedisCluster(
+                host=self.host,
+                port=self.port,
+                password=self.password,
+                max_connections=max_connections,
+                socket_keepalive=True,
+                socket_connect_timeout=self.socket_timeout,
+                socket_timeout=self.socket_timeout,
+                decode_responses=decode_responses
+            )
+        connection_pool = redis.ConnectionPool(
+            host=self.host,
+            port=self.port,
+            password=self.password,
+            max_connections=max_connections,
+            socket_keepalive=True,
+            socket_connect_timeout=self.socket_timeout,
+            socket_timeout=self.socket_timeout,
+            health_check_interval=30,
+            decode_responses=decode_responses
+        )
+        return redis.Redis(connection_pool=connection_pool)
+
+    def create_async_client(self):
+        """Async client with the same config, for background tasks running on the event loop"""
+        if self.cluster_mode:
+            return redis.asyncio.RedisCluster(
+                host=self.host,
+                port=self.port,
+                password=self.password,
+                socket_keepalive=True,
+                decode_responses=True
+            )
+        return redis.asyncio.Redis(
+            host=self.host,
+            port=self.port,
+            password=self.password,
+            socket_keepalive=True,
+            health_check_interval=30,
             decode_responses=True
         )
 
+    def close(self) -> None:
+        for client in (self.redis_client, self.binary_client):
+            if self.cluster_mode:
+                client.close()
+            else:
+                client.connection_pool.disconnect()
+
     def get_all_chores(self) -> List[Chore]:
-        chore_keys = self.redis_client.keys("chore:*")
-        chores = []
+        # SCAN instead of KEYS: non-blocking, and walks every primary in cluster mode
+        chore_keys = list(self.binary_client.scan_iter(match=CHORE_KEY_PATTERN, count=1000))
+        if not chore_keys:
+            return []
+        pipe = self.binary_client.pipeline(transaction=False)
         for key in chore_keys:
-            chore_data = self.redis_client.get(key)
-            if chore_data:
-                chores.append(Chore.parse_raw(chore_data))
-        return chores
+            pipe.get(key)
+        return [record_codec.decode_chore(chore_data) for chore_data in pipe.execute() if chore_data]
 
     def get_chore(self, chore_id: str) -> Optional[Chore]:
-        chore_data = self.redis_client.get(f"chore:{chore_id}")
+        chore_data = self.binary_client.get(chore_key(chore_id))
         if chore_data:
-            return Chore.parse_raw(chore_data)
+            return record_codec.decode_chore(chore_data)
         return None
 
     def save_chore(self, chore: Chore) -> None:
-        self.redis_client.set(f"chore:{chore.id}", chore.json())
+        self.binary_client.set(chore_key(chore.id), record_codec.encode_chore(chore))
 
     def delete_chore(self, chore_id: str) -> bool:
-        return bool(self.redis_client.delete(f"chore:{chore_id}"))
+        return bool(self.redis_client.delete(chore_key(chore_id)))
+
+    def index_chore_name(self, user_ids: List[str], chore_id: str, name: str, old_name: Optional[str] = None) -> None:
+        """Add a chore to each user's name index, replacing `old_name` on rename"""
+        member = chore_name_member(name, chore_id)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for user_id in user_ids:
+            if old_name is not None:
+                pipe.zrem(user_chore_names_key(user_id), chore_name_member(old_name, chore_id))
+            pipe.zadd(user_chore_names_key(user_id), {member: 0})
+        pipe.execute()
+
+    def unindex_chore_name(self, user_ids: List[str], chore_id: str, name: str) -> None:
+        member = chore_name_member(name, chore_id)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.zrem(user_chore_names_key(user_id), member)
+        pipe.execute()
+
+    def search_chores(self, user_id: str, prefix: str, limit: int) -> List[Chore]:
+        """Case-insensitive prefix match over a user's chore names, O(log n + k)"""
+        prefix = normalize_chore_name(prefix)
+        index_key = user_chore_names_key(user_id)
+        members = self.redis_client.zrangebylex(
+            index_key,
+            f"[{prefix}",
+            f"({prefix}{NAME_INDEX_MAX_CHAR}",
+            start=0,
+            num=limit
+        )
+        if not members:
+            return []
+
+        pipe = self.binary_client.pipeline(transaction=False)
+        for member in members:
+            pipe.get(chore_key(member.rsplit(NAME_INDEX_SEPARATOR, 1)[1]))
+
+        chores = []
+        stale = []
+        for member, chore_data in zip(members, pipe.execute()):
+            chore = record_codec.decode_chore(chore_data) if chore_data else None
+            # The index is updated in the background, so an entry can outlive the
+            # chore, the user's membership or the name it was indexed under. A
+            # member matching the current name also means the name has the prefix.
+            if (
+                chore is None
+                or not any(person.user_id == user_id for person in chore.people)
+                or member != chore_name_member(chore.name, chore.id)
+            ):
+                stale.append(member)
+            else:
+                chores.append(chore)
+        if stale:
+            self.redis_client.zrem(index_key, *stale)
+        return chores
 
     def publish_update(self, update: dict) -> None:
-        self.redis_client.publish("chore_updates", json.dumps(update))
+        """Publish an event to each participant's channel so only their workers receive it"""
+        message = json.dumps(update)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for user_id in set(update.get("participants", [])):
+            if self.cluster_mode:
+                # Sharded pub/sub: only the shard owning the channel's slot relays it
+                pipe.spublish(user_channel(user_id), message)
+            else:
+                pipe.publish(user_channel(user_id), message)
+        pipe.execute()
 
 
 # Create an instance of RedisService
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Callable, Dict, List, Optional
+import redis
+from dotenv import load_dotenv
+from app.services.keys import TASK_STREAM, TASK_DEAD_LETTER_STREAM
+from app.services.redis_service import redis_service
+
+load_dotenv()
+
+class TaskQueue:
+    """Durable queue for side effects that don't need to finish before the response.
+
+    Tasks are appended to a Redis stream and run by worker coroutines in a
+    consumer group, so each task runs on exactly one worker across the fleet.
+    Failed tasks are requeued with a backoff (a `not_before` time the workers
+    wait for without holding the entry) up to `max_attempts` times and then
+    moved to a dead-letter stream. Entries left pending by a crashed worker are
+    reclaimed once they have been idle for `claim_idle_ms`. Workers (re)create
+    the consumer group themselves, so they start while Redis is down and
+    recover if the stream is lost.
+
+    With TASK_QUEUE_SYNC=true tasks run inline inside `enqueue`, which is what
+    tests want.
+    """
+
+    group = "side_effects"
+
+    def __init__(self):
+        self.handlers: Dict[str, Callable] = {}
+        self.sync = os.getenv("TASK_QUEUE_SYNC", "false").lower() == "true"
+        self.worker_count = int(os.getenv("TASK_WORKERS", "2"))
+        self.max_attempts = int(os.getenv("TASK_MAX_ATTEMPTS", "5"))
+        self.claim_idle_ms = int(os.getenv("TASK_CLAIM_IDLE_MS", "60000"))
+        self.max_stream_length = int(os.getenv("TASK_STREAM_MAXLEN", "100000"))
+        self.redis_client = None
+        self.workers: List[asyncio.Task] = []
+
+    def register(self, name: str):
+        """Decorator registering a handler; payload keys are passed as keyword arguments"""
+        def decorator(func: Callable) -> Callable:
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    def run(self, name: str, payload: dict) -> None:
+        handler = self.handlers.get(name)
+        if handler is None:
+            raise KeyError(f"No handler registered for task {name}")
+        handler(**payload)
+
+    def enqueue(self, name: str, **payload) -> None:
+        """Queue a task, or run it right away in sync mode"""
+        data = json.dumps(payload)
+        if self.sync:
+            # Round-trip through JSON so sync mode catches unserializable payloads too
+            self.run(name, json.loads(data))
+            return
+        redis_service.redis_client.xadd(
+            TASK_STREAM,
+            {"task": name, "payload": data, "attempts": 0},
+            maxlen=self.max_stream_length,
+            approximate=True
+        )
+
+    async def start(self):
+        """Start workers (called from the app lifespan)"""
+        if self.sync:
+            return
+        self.redis_client = redis_service.create_async_client()
+        consumer_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self.workers = [
+            asyncio.create_task(self.worker(f"{consumer_prefix}-{i}"))
+            for i in range(self.worker_count)
+        ]
+
+    async def stop(self):
+        # In-flight entries stay pending and are reclaimed by another worker
+        for worker in self.workers:
+            worker.cancel()
+        for worker in self.workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self.workers = []
+        if self.redis_client:
+            await self.redis_client.aclose()
+            self.redis_client = None
+
+    async def create_group(self):
+        # id="0" so tasks enqueued into a recreated stream before the group existed still run
+        try:
+            await self.redis_client.xgroup_create(TASK_STREAM, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def worker(self, consumer: str):
+        loop = asyncio.get_running_loop()
+        last_claim = 0.0
+        has_group = False
+        failures = 0
+        while True:
+            try:
+                if not has_group:
+                    await self.create_group()
+                    has_group = True
+
+                # Pick up entries abandoned by workers that died mid-task
+                if loop.time() - last_claim >= self.claim_idle_ms / 1000:
+                    last_claim = loop.time()
+                    _, claimed, _ = await self.redis_client.xautoclaim(
+                        TASK_STREAM, self.group, consumer,
+                        min_idle_time=self.claim_idle_ms, start_id="0-0", count=10
+                    )
+                    for message_id, fields in claimed:
+                        await self.process(message_id, fields)
+
+                response = await self.redis_client.xreadgroup(
+                    self.group, consumer, {TASK_STREAM: ">"}, count=10, block=5000
+                )
+                ran = False
+                for _, messages in response or []:
+                    for message_id, fields in messages:
+                        ran = await self.process(message_id, fields) or ran
+                # Only retries still backing off came back; don't spin on them
+                if response and not ran:
+                    await asyncio.sleep(0.1)
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except redis.ResponseError as e:
+                if "NOGROUP" not in str(e):
+                    failures = await self.backoff(consumer, e, failures)
+                    continue
+                # Redis restarted without persistence or the stream was deleted
+                print(f"Task worker {consumer}: consumer group is gone, recreating it")
+                has_group = False
+            except Exception as e:
+                failures = await self.backoff(consumer, e, failures)
+
+    async def backoff(self, consumer: str, error: Exception, failures: int) -> int:
+        """Log a worker error and sleep before retrying, returning the new failure count"""
+        delay = min(0.5 * (2 ** failures), 30)
+        print(f"Task worker {consumer} error, retrying in {delay:.1f}s: {error}")
+        await asyncio.sleep(delay)
+        return failures + 1
+
+    async def process(self, message_id: str, fields: dict) -> bool:
+        """Run one entry; returns False if it was a retry put back because its backoff hasn't elapsed"""
+        if float(fields.get("not_before", 0)) > time.time():
+            # Requeue instead of sleeping, since an entry held pending past
+            # claim_idle_ms would be claimed and run by another worker too
+            await self.finish(message_id, retry=fields)
+            return False
+
+        name = fields.get("task")
+        attempts = int(fields.get("attempts", 0))
+        retry: Optional[dict] = None
+        dead: Optional[dict] = None
+        try:
+            # Handlers use the sync Redis client, so keep them off the event loop
+            await asyncio.to_thread(self.run, name, json.loads(fields["payload"]))
+        except Exception as e:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                print(f"Task {name} failed {attempts} times, moving to dead letter: {e}")
+                dead = {**fields, "attempts": attempts, "error": str(e)}
+            else:
+                print(f"Task {name} failed (attempt {attempts}), retrying: {e}")
+                retry = {**fields, "attempts": attempts, "not_before": time.time() + min(0.1 * (2 ** attempts), 5)}
+        await self.finish(message_id, retry=retry, dead=dead)
+        return True
+
+    async def finish(self, message_id: str, retry: Optional[dict] = None, dead: Optional[dict] = None):
+        # Requeue/dead-letter and ack atomically so a task is never lost or doubled here
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            if retry:
+                pipe.xadd(TASK_STREAM, retry, maxlen=self.max_stream_length, approximate=True)
+            if dead:
+                pipe.xadd(TASK_DEAD_LETTER_STREAM, dead)
+            pipe.xack(TASK_STREAM, self.group, message_id)
+            pipe.xdel(TASK_STREAM, message_id)
+            await pipe.execute()
+
+task_queue = TaskQueue()
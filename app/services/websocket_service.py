@@ -1,67 +1,315 @@
-from fastapi import WebSocket
-from typing import List, Dict
+from fastapi import WebSocket, status
+from typing import Dict, Optional, Set
+from dataclasses import dataclass, field
 import json
+import time
 import asyncio
+import os
+import random
 import redis.asyncio as redis
+from dotenv import load_dotenv
+from app.services.keys import user_channel
 from app.services.redis_service import redis_service
 
+load_dotenv()
+
+@dataclass
+class ConnectionInfo:
+    user_id: str
+    client: Optional[str]
+    # Messages waiting for this socket's writer task; None tells it to give up
+    outbox: asyncio.Queue = field(default_factory=asyncio.Queue)
+    writer: Optional[asyncio.Task] = None
+    connected_at: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+
 class WebSocketManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.redis_client = None
-    
-    async def connect(self, websocket: WebSocket):
+        # Keyed by socket so connect/disconnect/lookups are O(1)
+        self.active_connections: Dict[WebSocket, ConnectionInfo] = {}
+        # Sockets per user; each user with a socket here has their channel subscribed
+        self.user_connections: Dict[str, Set[WebSocket]] = {}
+        self.channel_users: Dict[str, str] = {}
+        self.redis_client: Optional[redis.Redis] = None
+        self.pubsub = None
+        self.subscriber_task: Optional[asyncio.Task] = None
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        self.subscriber_connected = False
+        self.reconnect_base_delay = float(os.getenv("REDIS_RECONNECT_BASE_DELAY", "0.5"))
+        self.reconnect_max_delay = float(os.getenv("REDIS_RECONNECT_MAX_DELAY", "30"))
+        self.heartbeat_interval = float(os.getenv("WS_HEARTBEAT_INTERVAL", "20"))
+        self.heartbeat_timeout = float(os.getenv("WS_HEARTBEAT_TIMEOUT", "60"))
+        # A peer that stops reading fills its send buffer. Each socket has its own
+        # writer task, so a stalled peer only delays itself until it is dropped
+        # after send_timeout or once send_queue_size messages are backed up.
+        self.send_timeout = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+        self.send_queue_size = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+        self.max_connections = int(os.getenv("WS_MAX_CONNECTIONS", "10000"))
+
+    async def connect(self, websocket: WebSocket, user_id: str) -> bool:
+        """Accept the socket and register it, or reject it if this worker is full"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        
-        # Start Redis subscriber if not already started
+        if len(self.active_connections) >= self.max_connections:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Server overloaded")
+            return False
+
+        info = ConnectionInfo(
+            user_id=user_id,
+            client=str(websocket.client),
+            outbox=asyncio.Queue(maxsize=self.send_queue_size + 1)
+        )
+        info.writer = asyncio.create_task(self.write(websocket, info))
+        self.active_connections[websocket] = info
+        if user_id not in self.user_connections:
+            self.user_connections[user_id] = set()
+            await self.subscribe_user(user_id)
+        self.user_connections[user_id].add(websocket)
+        return True
+
+    async def start(self):
+        """Open the async Redis client and start background tasks (called from the app lifespan)"""
+        self.redis_client = redis_service.create_async_client()
+        self.subscriber_task = asyncio.create_task(self.redis_subscriber())
+        self.heartbeat_task = asyncio.create_task(self.heartbeat())
+
+    async def stop(self):
+        """Cancel background tasks, close all sockets and release the Redis client"""
+        for task in (self.subscriber_task, self.heartbeat_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.subscriber_task = None
+        self.heartbeat_task = None
+
+        await asyncio.gather(*(
+            self.close(connection, code=status.WS_1001_GOING_AWAY)
+            for connection in list(self.active_connections)
+        ))
+
+        if self.redis_client:
+            await self.redis_client.aclose()
+            self.redis_client = None
+
+    async def redis_available(self) -> bool:
+        """Ping Redis without blocking the event loop, giving up after a second"""
         if not self.redis_client:
-            # Create async Redis client with same config as redis_service
-            self.redis_client = redis.Redis(
-                host=redis_service.redis_client.connection_pool.connection_kwargs.get('host'),
-                port=redis_service.redis_client.connection_pool.connection_kwargs.get('port'),
-                password=redis_service.redis_client.connection_pool.connection_kwargs.get('password'),
-                decode_responses=True
-            )
-            asyncio.create_task(self.redis_subscriber())
-    
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-    
-    async def send_personal_message(self, message: str, websocket: WebSocket):
+            return False
+        try:
+            return bool(await asyncio.wait_for(self.redis_client.ping(), timeout=1))
+        except (redis.RedisError, asyncio.TimeoutError):
+            return False
+
+    async def is_ready(self) -> bool:
+        """Whether this worker can currently deliver events to its clients"""
+        return self.subscriber_connected and await self.redis_available()
+
+    async def disconnect(self, websocket: WebSocket):
+        info = self.active_connections.pop(websocket, None)
+        if not info:
+            return
+        if info.writer and info.writer is not asyncio.current_task():
+            info.writer.cancel()
+        sockets = self.user_connections.get(info.user_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self.user_connections[info.user_id]
+                await self.unsubscribe_user(info.user_id)
+
+    async def subscribe_user(self, user_id: str):
+        channel = user_channel(user_id)
+        self.channel_users[channel] = user_id
+        # Subscribe right away so no events are missed; if this fails (or Redis
+        # is down) the subscriber loop picks the channel up from channel_users
+        if not self.pubsub or not self.subscriber_connected:
+            return
         try:
-            await websocket.send_text(message)
+            if redis_service.cluster_mode:
+                await self.pubsub.ssubscribe(channel)
+            else:
+                await self.pubsub.subscribe(channel)
         except Exception as e:
-            print(f"Error sending message to websocket: {e}")
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
-    
-    async def broadcast(self, message: str):
-        if not self.active_connections:
+            print(f"Error subscribing to {channel}, subscriber will retry: {e}")
+
+    async def unsubscribe_user(self, user_id: str):
+        channel = user_channel(user_id)
+        self.channel_users.pop(channel, None)
+        if not self.pubsub or not self.subscriber_connected:
             return
-            
-        connections_copy = self.active_connections.copy()
-        
-        for connection in connections_copy:
+        try:
+            if redis_service.cluster_mode:
+                await self.pubsub.sunsubscribe(channel)
+            else:
+                await self.pubsub.unsubscribe(channel)
+        except Exception as e:
+            print(f"Error unsubscribing from {channel}, subscriber will retry: {e}")
+
+    async def sync_subscriptions(self) -> bool:
+        """Bring the pub/sub subscriptions in line with channel_users.
+
+        Raises if Redis can't be reached, which makes the subscriber reconnect.
+        Returns whether any channel is subscribed.
+        """
+        if redis_service.cluster_mode:
+            subscribed = set(self.pubsub.shard_channels) - self.pubsub.pending_unsubscribe_shard_channels
+        else:
+            subscribed = set(self.pubsub.channels) - self.pubsub.pending_unsubscribe_channels
+        wanted = set(self.channel_users)
+        missing = list(wanted - subscribed)
+        extra = list(subscribed - wanted)
+        if missing:
+            if redis_service.cluster_mode:
+                await self.pubsub.ssubscribe(*missing)
+            else:
+                await self.pubsub.subscribe(*missing)
+        if extra:
+            if redis_service.cluster_mode:
+                await self.pubsub.sunsubscribe(*extra)
+            else:
+                await self.pubsub.unsubscribe(*extra)
+        return bool(wanted)
+
+    def touch(self, websocket: WebSocket):
+        """Record activity on the socket so the reaper leaves it alone"""
+        info = self.active_connections.get(websocket)
+        if info:
+            info.last_seen = time.monotonic()
+
+    async def close(self, websocket: WebSocket, code: int = status.WS_1000_NORMAL_CLOSURE):
+        await self.disconnect(websocket)
+        try:
+            # The close frame can block on a full send buffer too
+            await asyncio.wait_for(websocket.close(code=code), timeout=self.send_timeout)
+        except Exception:
+            # Socket is already gone or not reading
+            pass
+
+    def send(self, websocket: WebSocket, message: str) -> bool:
+        """Queue a message for the socket's writer task without waiting on the peer"""
+        info = self.active_connections.get(websocket)
+        if not info:
+            return False
+        # One slot is kept free for the None that makes the writer drop the socket
+        if info.outbox.qsize() >= self.send_queue_size:
+            if info.outbox.qsize() == self.send_queue_size:
+                info.outbox.put_nowait(None)
+            return False
+        info.outbox.put_nowait(message)
+        return True
+
+    async def write(self, websocket: WebSocket, info: ConnectionInfo):
+        """Deliver one socket's queued messages in order, closing it if it stalls or fails"""
+        while True:
+            message = await info.outbox.get()
+            if message is None:
+                print(f"Send queue full, dropping connection: {info.client}")
+                break
             try:
-                await connection.send_text(message)
+                await asyncio.wait_for(websocket.send_text(message), timeout=self.send_timeout)
+                # A peer still draining its socket counts as alive, so clients
+                # don't have to answer server pings
+                info.last_seen = time.monotonic()
+            except asyncio.TimeoutError:
+                print(f"Send timed out, dropping connection: {info.client}")
+                break
             except Exception as e:
-                print(f"Error broadcasting to connection: {e}")
-                if connection in self.active_connections:
-                    self.active_connections.remove(connection)
-    
+                print(f"Error sending message to websocket: {e}")
+                break
+        await self.close(websocket, code=status.WS_1011_INTERNAL_ERROR)
+
+    async def send_personal_message(self, message: str, websocket: WebSocket):
+        self.send(websocket, message)
+
+    async def broadcast(self, message: str):
+        for connection in list(self.active_connections):
+            self.send(connection, message)
+
+    async def send_to_user(self, user_id: str, message: str):
+        for connection in list(self.user_connections.get(user_id, ())):
+            self.send(connection, message)
+
+    async def heartbeat(self):
+        """Ping every socket periodically and reap ones with no traffic either way.
+
+        A dead peer stops accepting the pings, so its writer drops it after
+        send_timeout; clients may reply with {"type": "pong"} but don't need to.
+        """
+        ping = json.dumps({"type": "ping"})
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            idle = []
+            for connection, info in list(self.active_connections.items()):
+                if now - info.last_seen > self.heartbeat_timeout:
+                    print(f"Reaping idle websocket: {info.client}")
+                    idle.append(connection)
+                else:
+                    self.send(connection, ping)
+            # Close frames can stall too, so don't wait on them one at a time
+            await asyncio.gather(*(self.close(connection, code=status.WS_1001_GOING_AWAY) for connection in idle))
+
+    def reconnect_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        delay = min(self.reconnect_max_delay, self.reconnect_base_delay * (2 ** attempt))
+        return random.uniform(0, delay)
+
     async def redis_subscriber(self):
-        try:
-            pubsub = self.redis_client.pubsub()
-            await pubsub.subscribe("chore_updates")
-            print("Successfully subscribed to Redis pub/sub")
-            
-            async for message in pubsub.listen():
-                if message["type"] == "message":
-                    print(f"Broadcasting message: {message['data']}")
-                    await self.broadcast(message["data"])
-        except Exception as e:
-            print(f"Redis subscriber error: {e}")
+        """Relay pub/sub messages to clients, reconnecting whenever Redis drops"""
+        attempt = 0
+        has_connected = False
+        while True:
+            self.pubsub = self.redis_client.pubsub()
+            try:
+                # Only report ready once Redis has actually answered, even
+                # when there are no channels to restore yet
+                await self.redis_client.ping()
+                await self.sync_subscriptions()
+                self.subscriber_connected = True
+                attempt = 0
+                print("Successfully subscribed to Redis pub/sub")
+
+                # Events published while we were disconnected are lost, so
+                # tell clients to refetch their state
+                if has_connected:
+                    await self.broadcast(json.dumps({"type": "resync"}))
+                has_connected = True
+
+                while True:
+                    # Checked every pass so a failed subscribe is retried rather
+                    # than leaving a connected user without events
+                    if not await self.sync_subscriptions():
+                        # Nothing to read until some user connects to this worker,
+                        # but keep checking Redis so readiness stays accurate
+                        await self.redis_client.ping()
+                        await asyncio.sleep(1.0)
+                        continue
+                    if redis_service.cluster_mode:
+                        message = await self.pubsub.get_sharded_message(ignore_subscribe_messages=True, timeout=1.0)
+                    else:
+                        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if not message:
+                        continue
+                    user_id = self.channel_users.get(message["channel"])
+                    if user_id:
+                        await self.send_to_user(user_id, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Redis subscriber error: {e}")
+            finally:
+                self.subscriber_connected = False
+                try:
+                    await self.pubsub.aclose()
+                except Exception:
+                    pass
+                self.pubsub = None
+
+            delay = self.reconnect_delay(attempt)
+            attempt += 1
+            print(f"Reconnecting Redis subscriber in {delay:.1f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
 
-websocket_manager = WebSocketManager()
\ No newline at end of file
+websocket_manager = WebSocketManager()